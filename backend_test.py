@@ -1,3 +1,4 @@
+import os
 import requests
 import sys
 from datetime import datetime
@@ -235,7 +236,9 @@ def main():
     print("🚀 Starting Omnichain Yield Farming Aggregator API Tests")
     print("=" * 60)
     
-    tester = OmnichainAPITester()
+    # e.g. BACKEND_TEST_URL=http://localhost:8000/api against a server backed by benchmarks/mock_upstream.py
+    base_url = os.environ.get("BACKEND_TEST_URL")
+    tester = OmnichainAPITester(base_url) if base_url else OmnichainAPITester()
     
     # Run all tests
     test_methods = [
@@ -0,0 +1,145 @@
+"""Measure how the pool and arbitrage paths scale with universe size.
+
+Every size is drawn from the backend's seeded synthetic generator, so runs on
+two commits see identical data. For each size this reports the median time of:
+
+generate:  synthetic_pools, rows built from the vectorized columns
+ingest:    MarketDataCache.apply (validation, fragments, indexes, rollups, search)
+filter:    indexed chain and protocol lookups
+sort:      every pool by APY, as get_pools does
+search:    a prefix query on the symbol index
+rollups:   the /api/analytics/pools summary
+arbitrage: merging one opportunity per 100 pools into the book and ranking the top 10
+serialize: the /api/pools body for every pool from the cached fragments
+portfolio: overview totals over one position per 10 pools
+
+Usage:
+    python benchmarks/bench_scaling.py
+    python benchmarks/bench_scaling.py --pools 10000 100000 1000000 --repeat 3 --json scaling.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# Fail fast instead of waiting on the live ZetaChain node at import time
+os.environ.setdefault("ZETACHAIN_RPC_URL", "http://127.0.0.1:9")
+
+import server  # noqa: E402
+
+OPERATIONS = ("generate", "ingest", "filter", "sort", "search", "rollups", "arbitrage", "serialize", "portfolio")
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def make_opportunities(count, seed):
+    """Cross-chain quotes around the synthetic prices, with log-normal price gaps"""
+    rng = server.synthetic_rng(seed, "arbitrage")
+    _, series = server.synthetic_price_series(2, seed=seed)
+    tokens = list(series)
+    prices = np.array([series[token][-1] for token in tokens])
+    chains = [chain["id"] for chain in server.CHAINS_DATA]
+    token = rng.integers(0, len(tokens), count)
+    source = rng.integers(0, len(chains), count)
+    dest = (source + rng.integers(1, len(chains), count)) % len(chains)
+    gap = rng.lognormal(np.log(0.01), 0.6, count)
+    trade_size = rng.lognormal(np.log(5000), 0.8, count)
+    gas_cost = rng.uniform(0.5, 15, count)
+    expires_in = rng.integers(300, 1800, count)
+    now = datetime.now()
+    ids = server.synthetic_uuids(rng, count)
+    return [{
+        "id": ids[i],
+        "token_symbol": tokens[token[i]].upper(),
+        "source_chain": chains[source[i]],
+        "dest_chain": chains[dest[i]],
+        "source_price": round(float(prices[token[i]]), 4),
+        "dest_price": round(float(prices[token[i]] * (1 + gap[i])), 4),
+        "profit_percentage": round(float(gap[i] * 100), 2),
+        "profit_usd": round(float(trade_size[i] * gap[i]), 2),
+        "gas_cost_usd": round(float(gas_cost[i]), 2),
+        "net_profit_usd": round(float(trade_size[i] * gap[i] - gas_cost[i]), 2),
+        "trade_size_usd": round(float(trade_size[i]), 2),
+        "expires_at": now + timedelta(seconds=int(expires_in[i]))
+    } for i in range(count)]
+
+
+def overview(portfolios):
+    return {
+        "total_deposited": sum(p["deposited_amount_usd"] for p in portfolios),
+        "total_value": sum(p["current_value_usd"] for p in portfolios),
+        "chains_count": len({p["chain_id"] for p in portfolios}),
+    }
+
+
+def measure(count, repeat, seed):
+    results = {"pools": count}
+    results["generate"] = timed(lambda: server.synthetic_pools(count, seed), repeat)
+    pools = server.synthetic_pools(count, seed)
+
+    def ingest():
+        cache = server.MarketDataCache()
+        cache.apply(pools, "synthetic", {}, [])
+        return cache
+
+    results["ingest"] = timed(ingest, 1)
+    cache = ingest()
+    top_protocol = max(cache.pools_by_protocol, key=lambda protocol_id: len(cache.pools_by_protocol[protocol_id]))
+    results["filter"] = timed(lambda: (cache.pool_list(chain_id="ethereum"), cache.pool_list(protocol_id=top_protocol),
+                                       cache.pool_list("ethereum", top_protocol)), repeat)
+    results["sort"] = timed(lambda: sorted(cache.pool_list(), key=lambda pool: pool["apy"], reverse=True), repeat)
+    results["search"] = timed(lambda: cache.search_index.search("ETH", "prefix", 50), repeat)
+    results["rollups"] = timed(lambda: cache.rollups.summary([0.5, 0.9, 0.99], 20), repeat)
+
+    opportunities = make_opportunities(max(10, count // 100), seed)
+
+    def arbitrage():
+        book = server.OpportunityBook()
+        book.merge(opportunities, datetime.now())
+        return book.top_body(10)
+
+    results["arbitrage"] = timed(arbitrage, repeat)
+    fragments = cache.pool_fragments
+    results["serialize"] = timed(lambda: server.rows_response(fragments[pool_id] for pool_id in cache.pools), repeat)
+    portfolios = server.synthetic_portfolios(max(8, count // 10), pools, seed)
+    results["portfolio"] = timed(lambda: overview(portfolios), repeat)
+    return {key: round(value, 3) if key != "pools" else value for key, value in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pools", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=server.SYNTHETIC_SEED)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'pools':>8} " + " ".join(f"{operation:>10}" for operation in OPERATIONS) + "   (median ms)")
+    for count in args.pools:
+        row = measure(count, args.repeat, args.seed)
+        results.append(row)
+        print(f"{count:>8} " + " ".join(f"{row[operation]:>10.2f}" for operation in OPERATIONS))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"benchmark": "scaling", "seed": args.seed, "results": results},
+                                              indent=2))
+
+
+if __name__ == "__main__":
+    main()
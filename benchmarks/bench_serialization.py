@@ -0,0 +1,86 @@
+"""Compare the /api/pools serialization paths.
+
+legacy: build a Pool per row and let FastAPI validate and encode the list
+        against response_model, as get_pools did before the fast path.
+fast:   join the row fragments that MarketDataCache encoded at ingest.
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --rows 20 1000 15000 --repeat 50 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# Fail fast instead of waiting on the live ZetaChain node at import time
+os.environ.setdefault("ZETACHAIN_RPC_URL", "http://127.0.0.1:9")
+
+import server  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+
+async def legacy_body(rows, field):
+    content = await serialize_response(field=field, response_content=[server.Pool(**row) for row in rows])
+    return JSONResponse(content).body
+
+
+def fast_body(cache, rows):
+    fragments = cache.pool_fragments
+    return server.rows_response(fragments[row["id"]] for row in rows).body
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 1000, 15000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    field = next(route.response_field for route in server.app.routes if getattr(route, "path", None) == "/api/pools")
+    loop = asyncio.new_event_loop()
+    results = []
+
+    print(f"encoder: {'orjson' if server.orjson else 'json'}")
+    print(f"{'rows':>7} {'legacy ms':>10} {'fast ms':>9} {'speedup':>8} {'ingest ms':>10}")
+    for count in args.rows:
+        rows = server.synthetic_pools(count)
+        cache = server.MarketDataCache()
+        start = time.perf_counter()
+        cache.apply(rows, "benchmark", {}, [])
+        ingest_ms = (time.perf_counter() - start) * 1000
+
+        assert json.loads(loop.run_until_complete(legacy_body(rows, field))) == json.loads(fast_body(cache, rows))
+        legacy_ms = timed(lambda: loop.run_until_complete(legacy_body(rows, field)), args.repeat)
+        fast_ms = timed(lambda: fast_body(cache, rows), args.repeat)
+        results.append({
+            "rows": count,
+            "legacy_ms": round(legacy_ms, 3),
+            "fast_ms": round(fast_ms, 3),
+            "speedup": round(legacy_ms / fast_ms, 1),
+            "ingest_ms": round(ingest_ms, 3)
+        })
+        print(f"{count:>7} {legacy_ms:>10.3f} {fast_ms:>9.3f} {legacy_ms / fast_ms:>7.1f}x {ingest_ms:>10.3f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({"benchmark": "serialization", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Concurrent load test and latency benchmark for every /api route.
+
+By default this starts benchmarks/mock_upstream.py and a local uvicorn server
+wired to it, discovers the routes from the server's OpenAPI schema and drives
+each one in turn at the requested concurrency (and optionally a fixed request
+rate). For each route it reports p50/p95/p99 latency, throughput, error rate
+and the server's peak RSS, and can save the results as JSON so runs from two
+commits can be compared.
+
+    python benchmarks/load_test.py --concurrency 32 --duration 10 --output before.json
+    python benchmarks/load_test.py --concurrency 32 --duration 10 --compare before.json
+    python benchmarks/load_test.py --base-url http://localhost:8000 --server-pid 1234 --routes /api/pools
+    python benchmarks/load_test.py --synthetic-pools 100000 --routes /api/pools /api/pools/search
+
+--synthetic-pools withholds the yields feed so the server serves its seeded
+synthetic universe of that many pools instead, for scaling runs.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlencode
+
+import aiohttp
+
+from mock_upstream import upstream_env
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+BACKEND_DIR = REPO_DIR / "backend"
+
+# Values for path parameters and request bodies
+PATH_PARAMS = {
+    "address": "0x5F0b1a82749cb4E2278EC87F8BF6B618dC71a8bf",
+}
+# Sample values for query parameters; routes with a required parameter not listed here are skipped
+QUERY_PARAMS = {
+    "/api/pools/search": {"q": "usdc"},
+}
+REQUEST_BODIES = {
+    "/api/strategy/optimize": {"risk_tolerance": "medium", "investment_amount": 10000,
+                               "preferred_chains": ["ethereum", "polygon"]},
+    "/api/zetachain/cross-chain-transaction": {"from_chain": "ethereum", "to_chain": "zetachain",
+                                               "amount": 100.0, "token": "ETH"},
+    # One rebalancing cycle's worth of quotes; dry run so the database is left alone
+    "/api/zetachain/cross-chain-transactions": {"dry_run": True, "transfers": [
+        {"from_chain": source, "to_chain": dest, "amount": 1000.0 + i, "token": "USDC"}
+        for i in range(250)
+        for source, dest in (("ethereum", "zetachain"), ("polygon", "arbitrum"))
+    ]},
+}
+# Long-lived streams and admin tooling are skipped
+SKIPPED_PREFIXES = ("/api/stream/", "/api/admin/")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def read_rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+async def wait_until_ready(session, base_url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/api/") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"server at {base_url} did not become ready within {timeout}s")
+
+
+async def discover_routes(session, base_url, only):
+    async with session.get(f"{base_url}/openapi.json") as response:
+        schema = await response.json()
+    routes = []
+    for path, operations in sorted(schema["paths"].items()):
+        if not path.startswith("/api") or path.startswith(SKIPPED_PREFIXES):
+            continue
+        if only and path not in only:
+            continue
+        for method, operation in operations.items():
+            if method.upper() not in ("GET", "POST"):
+                continue
+            query = QUERY_PARAMS.get(path, {})
+            missing = [param["name"] for param in operation.get("parameters", [])
+                       if param["in"] == "query" and param.get("required") and param["name"] not in query]
+            if missing:
+                print(f"skipping {method.upper()} {path}: no sample value for {', '.join(missing)}")
+                continue
+            url_path = path.format(**PATH_PARAMS)
+            if query:
+                url_path += "?" + urlencode(query)
+            routes.append({"method": method.upper(), "path": path, "url_path": url_path,
+                           "body": REQUEST_BODIES.get(path, {}) if method.upper() == "POST" else None})
+    return routes
+
+
+async def drive_route(session, base_url, route, concurrency, duration, total_requests, rate, server_pid):
+    latencies = []
+    statuses = {}
+    errors = 0
+    peak_rss = read_rss_mb(server_pid) if server_pid else None
+    url = f"{base_url}{route['url_path']}"
+    started = time.monotonic()
+    deadline = started + duration if duration else None
+    issued = 0
+    stop = asyncio.Event()
+
+    def next_slot():
+        nonlocal issued
+        if total_requests and issued >= total_requests:
+            return None
+        if deadline and time.monotonic() >= deadline:
+            return None
+        slot = issued
+        issued += 1
+        return slot
+
+    async def worker():
+        nonlocal errors
+        while True:
+            slot = next_slot()
+            if slot is None:
+                return
+            if rate:
+                # Open-loop pacing: request n is due at n / rate seconds
+                delay = started + slot / rate - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            start = time.perf_counter()
+            try:
+                async with session.request(route["method"], url, json=route["body"]) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = 0
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == 0 or status >= 400:
+                errors += 1
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while not stop.is_set():
+            rss = read_rss_mb(server_pid)
+            if rss is not None:
+                peak_rss = max(peak_rss or 0, rss)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_rss()) if server_pid else None
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    stop.set()
+    if sampler:
+        await sampler
+
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "method": route["method"],
+        "path": route["path"],
+        "requests": count,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+def print_results(results):
+    print(f"{'route':<48} {'req':>7} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'err%':>6} {'rss MB':>7}")
+    for row in results:
+        latency = row["latency_ms"]
+        rss = f"{row['rss_mb']:.1f}" if row["rss_mb"] is not None else "-"
+        print(f"{row['method'] + ' ' + row['path']:<48} {row['requests']:>7} {row['throughput_rps']:>9.1f} "
+              f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} "
+              f"{row['error_rate'] * 100:>6.2f} {rss:>7}")
+
+
+def compare_results(baseline, results, threshold):
+    """Print per-route changes against a previous run; return the number of regressions"""
+    previous = {(row["method"], row["path"]): row for row in baseline["routes"]}
+    regressions = 0
+    print(f"\nagainst {baseline.get('commit') or 'baseline'} ({baseline.get('started_at')}):")
+    print(f"{'route':<48} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9}")
+    for row in results:
+        before = previous.get((row["method"], row["path"]))
+        if before is None:
+            print(f"{row['method'] + ' ' + row['path']:<48} {'new':>9}")
+            continue
+        changes = []
+        for key in ("p50", "p95", "p99"):
+            old, new = before["latency_ms"][key], row["latency_ms"][key]
+            changes.append((new - old) / old * 100 if old else 0.0)
+        old_rps, new_rps = before["throughput_rps"], row["throughput_rps"]
+        changes.append((new_rps - old_rps) / old_rps * 100 if old_rps else 0.0)
+        regressed = any(change > threshold for change in changes[:3]) or changes[3] < -threshold
+        regressions += regressed
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{row['method'] + ' ' + row['path']:<48} " + " ".join(f"{c:>+8.1f}%" for c in changes) + marker)
+    return regressions
+
+
+async def run(args):
+    processes = []
+    base_url = args.base_url
+    server_pid = args.server_pid
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=0)
+    try:
+        if not base_url:
+            mock_url = f"http://127.0.0.1:{args.mock_port}"
+            mock_args = [sys.executable, str(Path(__file__).with_name("mock_upstream.py")), "serve",
+                         "--port", str(args.mock_port), "--latency-ms", str(args.upstream_latency_ms),
+                         "--error-rate", str(args.upstream_error_rate), "--payload-scale", str(args.payload_scale)]
+            processes.append(subprocess.Popen(mock_args, stdout=subprocess.DEVNULL))
+            env = {**os.environ, **upstream_env(mock_url)}
+            if args.synthetic_pools:
+                # Yields requests 404, so every refresh falls back to the synthetic universe
+                env["DEFILLAMA_YIELDS_URL"] = f"{mock_url}/unavailable"
+                env["FALLBACK_POOL_COUNT"] = str(args.synthetic_pools)
+                # A warm-start file from an earlier run would be kept as DeFiLlama data instead
+                env["WARM_START_PATH"] = ""
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--log-level", "warning"],
+                cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL
+            )
+            processes.append(server)
+            base_url = f"http://127.0.0.1:{args.port}"
+            server_pid = server.pid
+
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            await wait_until_ready(session, base_url, args.startup_timeout)
+            routes = await discover_routes(session, base_url, set(args.routes or []))
+            # Let background refreshes populate caches before measuring
+            await asyncio.sleep(args.warmup)
+            results = []
+            for route in routes:
+                for _ in range(3):
+                    async with session.request(route["method"], f"{base_url}{route['url_path']}",
+                                               json=route["body"]) as response:
+                        await response.read()
+                results.append(await drive_route(session, base_url, route, args.concurrency, args.duration,
+                                                 args.requests, args.rate, server_pid))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="drive an already running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="pid of that server, for RSS sampling")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--mock-port", type=int, default=8900)
+    parser.add_argument("--routes", nargs="*", help="only these paths, as they appear in the OpenAPI schema")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per route")
+    parser.add_argument("--requests", type=int, default=0, help="stop each route after this many requests")
+    parser.add_argument("--rate", type=float, default=0.0, help="target requests per second (0 = unthrottled)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-scale", type=int, default=1)
+    parser.add_argument("--synthetic-pools", type=int, default=0,
+                        help="serve this many seeded synthetic pools instead of the recorded yields feed")
+    parser.add_argument("--output", help="write machine-readable results to this file")
+    parser.add_argument("--compare", help="results file from a previous run to diff against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("one of --duration or --requests must be non-zero")
+
+    started_at = datetime.now().isoformat(timespec="seconds")
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    report = {
+        "benchmark": "load_test",
+        "commit": git_commit(),
+        "started_at": started_at,
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "routes": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        regressions = compare_results(json.loads(Path(args.compare).read_text()), results, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
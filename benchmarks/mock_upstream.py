@@ -0,0 +1,418 @@
+"""Local stand-in for the upstream APIs the backend depends on.
+
+Serves recorded DeFiLlama (yields and api) and CoinGecko payloads, plus a fake
+JSON-RPC node for every chain, so the backend can be benchmarked offline and
+reproducibly. Latency, error rate and payload size can be injected.
+
+    python benchmarks/mock_upstream.py serve --port 8900
+    python benchmarks/mock_upstream.py serve --latency-ms 80 --jitter-ms 20 --error-rate 0.05 --payload-scale 50
+    python benchmarks/mock_upstream.py record --limit-pools 500
+
+Point the backend at it with the variables printed on startup, e.g.
+
+    DEFILLAMA_YIELDS_URL=http://127.0.0.1:8900/yields
+    DEFILLAMA_API_URL=http://127.0.0.1:8900/llama
+    COINGECKO_API_URL=http://127.0.0.1:8900/coingecko
+    CHAIN_RPC_URL_TEMPLATE=http://127.0.0.1:8900/rpc/{chain_id}
+    ZETACHAIN_RPC_URL=http://127.0.0.1:8900/rpc/zetachain
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "upstream"
+
+# Fixture file -> upstream URL it was recorded from
+RECORDED_FEEDS = {
+    "yields_pools.json": "https://yields.llama.fi/pools",
+    "llama_protocols.json": "https://api.llama.fi/protocols",
+    "coingecko_simple_price.json": (
+        "https://api.coingecko.com/api/v3/simple/price"
+        "?ids=ethereum,binancecoin,matic-network,avalanche-2,arbitrum,bitcoin,zetachain&vs_currencies=usd"
+    ),
+}
+
+# Same public endpoints as fetch_chain_data in backend/server.py
+RECORDED_RPC_URLS = {
+    "zetachain": "https://zetachain-athens-evm.blockpi.network/v1/rpc/public",
+    "ethereum": "https://eth.llamarpc.com",
+    "bsc": "https://bsc-dataseed1.binance.org",
+    "polygon": "https://polygon-rpc.com",
+    "avalanche": "https://api.avax.network/ext/bc/C/rpc",
+    "arbitrum": "https://arb1.arbitrum.io/rpc",
+}
+
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+# Days of per-pool chart history served by /yields/chart/{pool}
+CHART_DAYS = 60
+
+
+def upstream_env(base_url):
+    """Environment variables that point the backend at a running stand-in"""
+    base_url = base_url.rstrip("/")
+    return {
+        "DEFILLAMA_YIELDS_URL": f"{base_url}/yields",
+        "DEFILLAMA_API_URL": f"{base_url}/llama",
+        "COINGECKO_API_URL": f"{base_url}/coingecko",
+        "CHAIN_RPC_URL_TEMPLATE": f"{base_url}/rpc/{{chain_id}}",
+        "ZETACHAIN_RPC_URL": f"{base_url}/rpc/zetachain",
+    }
+
+
+def load_fixture(fixtures_dir, name):
+    return json.loads((Path(fixtures_dir) / name).read_text())
+
+
+def scale_rows(rows, scale, id_field):
+    """Replicate list payloads so parse and transfer costs can be pushed up"""
+    if scale <= 1:
+        return rows
+    scaled = list(rows)
+    for copy in range(1, scale):
+        for row in rows:
+            clone = dict(row)
+            clone[id_field] = f"{row[id_field]}-{copy}"
+            scaled.append(clone)
+    return scaled
+
+
+class FakeChain:
+    """Just enough of an EVM node for the backend's gas, block, balance and pair reserve reads"""
+
+    def __init__(self, chain_id, gas_price_gwei, block_number, block_time, rng, pairs=None):
+        self.chain_id = chain_id
+        self.gas_price_gwei = gas_price_gwei
+        self.base_block = block_number
+        self.block_time = block_time
+        self.started = time.time()
+        self.rng = rng
+        # lowercased pair address -> (reserve0, reserve1)
+        self.pairs = pairs or {}
+
+    def block_number(self):
+        return self.base_block + int((time.time() - self.started) / self.block_time)
+
+    def gas_price_wei(self):
+        return int(self.gas_price_gwei * 1e9 * (1 + self.rng.uniform(-0.1, 0.1)))
+
+    def block(self, number):
+        block_hash = "0x" + hashlib.sha256(f"{self.chain_id}:{number}".encode()).hexdigest()
+        return {
+            "number": hex(number),
+            "hash": block_hash,
+            "parentHash": "0x" + hashlib.sha256(f"{self.chain_id}:{number - 1}".encode()).hexdigest(),
+            "timestamp": hex(int(self.started + (number - self.base_block) * self.block_time)),
+            "baseFeePerGas": hex(self.gas_price_wei()),
+            "gasLimit": hex(30_000_000),
+            "gasUsed": hex(15_000_000),
+            "miner": "0x" + "00" * 20,
+            "difficulty": "0x0",
+            "totalDifficulty": "0x0",
+            "extraData": "0x",
+            "logsBloom": "0x" + "00" * 256,
+            "nonce": "0x0000000000000000",
+            "sha3Uncles": "0x" + "00" * 32,
+            "stateRoot": "0x" + "00" * 32,
+            "receiptsRoot": "0x" + "00" * 32,
+            "transactionsRoot": "0x" + "00" * 32,
+            "mixHash": "0x" + "00" * 32,
+            "size": hex(50_000),
+            "transactions": [],
+            "uncles": [],
+        }
+
+    def reserves(self, pair, number):
+        """Pair reserves at a block; the price drifts by up to 1% from block to block"""
+        reserve0, reserve1 = self.pairs[pair]
+        digest = hashlib.sha256(f"{self.chain_id}:{pair}:{number}".encode()).digest()
+        drift = 1 + (int.from_bytes(digest[:4], "big") / 2**32 - 0.5) * 0.02
+        return int(reserve0 * drift), int(reserve1 / drift)
+
+    def _resolve_block(self, tag):
+        if isinstance(tag, str) and tag.startswith("0x"):
+            return int(tag, 16)
+        return self.block_number()
+
+    def call(self, method, params):
+        if method == "eth_chainId":
+            return hex(self.chain_id)
+        if method == "net_version":
+            return str(self.chain_id)
+        if method == "web3_clientVersion":
+            return "mock-upstream/1.0"
+        if method == "eth_blockNumber":
+            return hex(self.block_number())
+        if method == "eth_gasPrice":
+            return hex(self.gas_price_wei())
+        if method == "eth_maxPriorityFeePerGas":
+            return hex(int(self.gas_price_gwei * 1e8))
+        if method == "eth_feeHistory":
+            count = int(params[0], 16) if isinstance(params[0], str) else int(params[0])
+            newest = self._resolve_block(params[1])
+            percentiles = params[2] if len(params) > 2 else []
+            return {
+                "oldestBlock": hex(newest - count + 1),
+                "baseFeePerGas": [hex(self.gas_price_wei()) for _ in range(count + 1)],
+                "gasUsedRatio": [round(self.rng.uniform(0.3, 0.7), 4) for _ in range(count)],
+                "reward": [
+                    [hex(int(self.gas_price_gwei * 1e7 * (1 + pct / 50))) for pct in percentiles]
+                    for _ in range(count)
+                ],
+            }
+        if method == "eth_getBlockByNumber":
+            return self.block(self._resolve_block(params[0]))
+        if method == "eth_getBalance":
+            digest = hashlib.sha256(str(params[0]).lower().encode()).digest()
+            return hex(int.from_bytes(digest[:8], "big"))
+        if method == "eth_call":
+            target = str(params[0].get("to", "")).lower()
+            if params[0].get("data", "").startswith("0x0902f1ac") and target in self.pairs:
+                number = self._resolve_block(params[1] if len(params) > 1 else "latest")
+                reserve0, reserve1 = self.reserves(target, number)
+                timestamp = int(self.started + (number - self.base_block) * self.block_time)
+                return "0x" + "".join(f"{word:064x}" for word in (reserve0, reserve1, timestamp))
+            return "0x" + "00" * 32
+        raise LookupError(method)
+
+
+class MockUpstream:
+    def __init__(self, fixtures_dir, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 error_statuses=(500, 429, 503), payload_scale=1, seed=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+        yields = load_fixture(fixtures_dir, "yields_pools.json")
+        yields["body"]["data"] = scale_rows(yields["body"]["data"], payload_scale, "pool")
+        self.pools = {pool["pool"]: pool for pool in yields["body"]["data"]}
+        protocols = load_fixture(fixtures_dir, "llama_protocols.json")
+        protocols["body"] = scale_rows(protocols["body"], payload_scale, "slug")
+        prices = load_fixture(fixtures_dir, "coingecko_simple_price.json")
+        # Encode once so the stand-in never becomes the bottleneck
+        self.feeds = {
+            name: (json.dumps(envelope["body"]).encode(), envelope.get("headers", {}))
+            for name, envelope in (("yields", yields), ("protocols", protocols), ("prices", prices))
+        }
+
+        rpc = load_fixture(fixtures_dir, "rpc_chains.json")
+        dex_pairs = load_fixture(fixtures_dir, "dex_pairs.json")["pairs"]
+        self.chains = {
+            name: FakeChain(spec["chain_id"], spec["gas_price_gwei"], spec["block_number"], spec["block_time"],
+                            random.Random(f"{seed}:{name}"), dex_pairs.get(name))
+            for name, spec in rpc["chains"].items()
+        }
+
+    async def _inject(self):
+        """Apply configured latency; return an error response if one should be injected"""
+        self.requests += 1
+        if self.latency_ms or self.jitter_ms:
+            delay = max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms))
+            await asyncio.sleep(delay / 1000)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            status = self.rng.choice(self.error_statuses)
+            headers = {"Retry-After": "1"} if status in (429, 503) else {}
+            return web.json_response({"error": "injected failure"}, status=status, headers=headers)
+        return None
+
+    async def _feed(self, request, name):
+        error = await self._inject()
+        if error is not None:
+            return error
+        body, recorded_headers = self.feeds[name]
+        headers = {key: value for key, value in recorded_headers.items() if key in KEPT_HEADERS}
+        etag = headers.get("ETag")
+        if etag and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        last_modified = headers.get("Last-Modified")
+        if last_modified and not etag and request.headers.get("If-Modified-Since") == last_modified:
+            return web.Response(status=304, headers={"Last-Modified": last_modified})
+        headers.pop("Content-Type", None)
+        response = web.Response(body=body, content_type="application/json", headers=headers)
+        response.enable_compression()
+        return response
+
+    async def yields_pools(self, request):
+        return await self._feed(request, "yields")
+
+    async def llama_protocols(self, request):
+        return await self._feed(request, "protocols")
+
+    async def coingecko_price(self, request):
+        return await self._feed(request, "prices")
+
+    async def yields_chart(self, request):
+        """Daily history for one pool, ending today, derived from its recorded APY and TVL.
+
+        A new point appears each UTC day and the ETag changes with it, like
+        the real endpoint.
+        """
+        error = await self._inject()
+        if error is not None:
+            return error
+        pool_id = request.match_info["pool"]
+        pool = self.pools.get(pool_id)
+        if pool is None:
+            return web.json_response({"status": "error", "data": []}, status=404)
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        etag = f'W/"chart-{pool_id}-{today.date().isoformat()}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        base_apy = pool.get("apy") or 1.0
+        base_tvl = pool.get("tvlUsd") or 0
+        points = []
+        for days_ago in range(CHART_DAYS - 1, -1, -1):
+            day = today - timedelta(days=days_ago)
+            rng = random.Random(f"{pool_id}:{day.date().isoformat()}")
+            apy = max(0.0, base_apy * (1 + 0.15 * math.sin(day.toordinal() / 5) + rng.gauss(0, 0.05)))
+            points.append({
+                "timestamp": day.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                "tvlUsd": int(base_tvl * (1 + rng.gauss(0, 0.02))),
+                "apy": round(apy, 5),
+                "apyBase": round(apy, 5),
+                "apyReward": None,
+                "il7d": None,
+                "apyBase7d": None,
+            })
+        response = web.json_response({"status": "success", "data": points}, headers={"ETag": etag})
+        response.enable_compression()
+        return response
+
+    async def rpc(self, request):
+        chain = self.chains.get(request.match_info["chain"])
+        if chain is None:
+            return web.json_response({"error": "unknown chain"}, status=404)
+        error = await self._inject()
+        if error is not None:
+            return error
+        payload = await request.json()
+        calls = payload if isinstance(payload, list) else [payload]
+        results = []
+        for call in calls:
+            try:
+                result = {"result": chain.call(call.get("method"), call.get("params") or [])}
+            except LookupError:
+                result = {"error": {"code": -32601, "message": f"Method {call.get('method')} not found"}}
+            results.append({"jsonrpc": "2.0", "id": call.get("id"), **result})
+        return web.json_response(results if isinstance(payload, list) else results[0])
+
+    async def stats(self, request):
+        return web.json_response({"requests": self.requests, "errors": self.errors})
+
+    def build_app(self):
+        app = web.Application()
+        app.router.add_get("/yields/pools", self.yields_pools)
+        app.router.add_get("/yields/chart/{pool}", self.yields_chart)
+        app.router.add_get("/llama/protocols", self.llama_protocols)
+        app.router.add_get("/coingecko/simple/price", self.coingecko_price)
+        app.router.add_post("/rpc/{chain}", self.rpc)
+        app.router.add_get("/_stats", self.stats)
+        return app
+
+
+async def record(fixtures_dir, limit_pools):
+    """Capture real upstream responses into fixture files"""
+    fixtures_dir = Path(fixtures_dir)
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        for name, url in RECORDED_FEEDS.items():
+            async with session.get(url) as response:
+                body = await response.json(content_type=None)
+                headers = {key: response.headers[key] for key in KEPT_HEADERS if key in response.headers}
+            if name == "yields_pools.json" and limit_pools:
+                body["data"] = body["data"][:limit_pools]
+            envelope = {
+                "url": url,
+                "status": response.status,
+                "headers": headers,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                "body": body,
+            }
+            (fixtures_dir / name).write_text(json.dumps(envelope, indent=1))
+            print(f"recorded {url} -> {name} (HTTP {response.status})")
+
+        chains = {}
+        for name, url in RECORDED_RPC_URLS.items():
+            payload = [
+                {"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []},
+                {"jsonrpc": "2.0", "id": 2, "method": "eth_gasPrice", "params": []},
+                {"jsonrpc": "2.0", "id": 3, "method": "eth_blockNumber", "params": []},
+            ]
+            try:
+                async with session.post(url, json=payload) as response:
+                    results = {item["id"]: item.get("result") for item in await response.json(content_type=None)}
+                chains[name] = {
+                    "chain_id": int(results[1], 16),
+                    "gas_price_gwei": round(int(results[2], 16) / 1e9, 4),
+                    "block_number": int(results[3], 16),
+                    "block_time": 1,
+                }
+                print(f"recorded rpc {name}: {chains[name]}")
+            except Exception as e:
+                print(f"could not record rpc {name}: {e}")
+        rpc_path = fixtures_dir / "rpc_chains.json"
+        if rpc_path.exists():
+            previous = json.loads(rpc_path.read_text())["chains"]
+            for name, spec in chains.items():
+                spec["block_time"] = previous.get(name, spec)["block_time"]
+            chains = {**previous, **chains}
+        rpc_path.write_text(json.dumps({"recorded_at": datetime.now().isoformat(timespec="seconds"), "chains": chains}, indent=1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve recorded fixtures")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8900)
+    serve.add_argument("--latency-ms", type=float, default=0.0, help="mean added latency per request")
+    serve.add_argument("--jitter-ms", type=float, default=0.0, help="standard deviation of added latency")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    serve.add_argument("--error-statuses", default="500,429,503")
+    serve.add_argument("--payload-scale", type=int, default=1, help="replicate list payloads this many times")
+    serve.add_argument("--seed", type=int, default=1)
+
+    rec = commands.add_parser("record", help="capture real upstream responses into fixtures")
+    rec.add_argument("--limit-pools", type=int, default=500, help="keep this many yield pools (0 keeps all)")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        asyncio.run(record(args.fixtures, args.limit_pools))
+        return 0
+
+    upstream = MockUpstream(
+        args.fixtures,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_statuses=tuple(int(status) for status in args.error_statuses.split(",")),
+        payload_scale=args.payload_scale,
+        seed=args.seed,
+    )
+    base_url = f"http://{args.host}:{args.port}"
+    for key, value in upstream_env(base_url).items():
+        print(f"{key}={value}")
+    sys.stdout.flush()
+    web.run_app(upstream.build_app(), host=args.host, port=args.port, print=None, access_log=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,22 @@ import config from "./config";
 
 const API = config.API_BASE_URL;
 
+// Merge pushed field-level pool changes into the rows that are already shown
+const updateShownRows = (rows, changes) => {
+  const changed = changes.changed || {};
+  const removed = new Set(changes.removed || []);
+  return rows
+    .filter((row) => !removed.has(row.id))
+    .map((row) => (changed[row.id] ? { ...row, ...changed[row.id] } : row));
+};
+
+const topOpportunities = (rows, changes) => {
+  const byId = new Map(rows.map((row) => [row.id, row]));
+  (changes.removed || []).forEach((id) => byId.delete(id));
+  (changes.upserted || []).forEach((row) => byId.set(row.id, row));
+  return [...byId.values()].sort((a, b) => b.net_profit_usd - a.net_profit_usd).slice(0, 10);
+};
+
 const Dashboard = () => {
   const [analytics, setAnalytics] = useState(null);
   const [pools, setPools] = useState([]);
@@ -37,36 +53,81 @@ const Dashboard = () => {
     fetchData();
   }, []);
 
+  useEffect(() => {
+    // Live updates pushed by the backend after each background refresh
+    if (typeof EventSource === 'undefined') return undefined;
+    const source = new EventSource(`${API}/stream/market`);
+    source.addEventListener('snapshot', (event) => {
+      const snapshot = JSON.parse(event.data);
+      const changed = Object.fromEntries(snapshot.pools.map((pool) => [pool.id, pool]));
+      setPools((rows) => updateShownRows(rows, { changed }));
+      setArbitrage(topOpportunities([], { upserted: snapshot.arbitrage }));
+    });
+    source.addEventListener('delta', (event) => {
+      const changes = JSON.parse(event.data);
+      if (changes.pools) setPools((rows) => updateShownRows(rows, changes.pools));
+      if (changes.arbitrage) setArbitrage((rows) => topOpportunities(rows, changes.arbitrage));
+    });
+    return () => source.close();
+  }, []);
+
   const fetchData = async () => {
+    // One composite request; each panel is applied as soon as its line arrives
+    const setters = {
+      api_status: setApiStatus,
+      zetachain_status: setZetachainStatus,
+      overview: setAnalytics,
+      pools: setPools,
+      portfolio: setPortfolio,
+      arbitrage: setArbitrage,
+      chains: setChains,
+      protocols: setProtocols,
+      omnichain_pools: setZetaPools,
+      supported_chains: (data) => setSupportedChains(data.chains || []),
+    };
+    const fallbacks = {
+      api_status: { error: 'API not available' },
+      zetachain_status: { error: 'ZetaChain not available' },
+      overview: null,
+      pools: [],
+      portfolio: [],
+      arbitrage: [],
+      chains: [],
+      protocols: [],
+      omnichain_pools: [],
+      supported_chains: { chains: [] },
+    };
+    const pending = new Set(Object.keys(setters));
+    const applyPanel = ({ panel, status, data }) => {
+      setters[panel](status === 200 ? data : fallbacks[panel]);
+      pending.delete(panel);
+      setLoading(false);
+    };
+
     try {
-      const [apiStatusRes, zetachainStatusRes, analyticsRes, poolsRes, portfolioRes, arbitrageRes, chainsRes, protocolsRes, zetaPoolsRes, supportedChainsRes] = await Promise.all([
-        axios.get(`${API}/`).catch(() => ({ data: { error: 'API not available' } })),
-        axios.get(`${API}/zetachain/status`).catch(() => ({ data: { error: 'ZetaChain not available' } })),
-        axios.get(`${API}/analytics/overview`).catch(() => ({ data: null })),
-        axios.get(`${API}/pools`).catch(() => ({ data: [] })),
-        axios.get(`${API}/portfolio`).catch(() => ({ data: [] })),
-        axios.get(`${API}/arbitrage`).catch(() => ({ data: [] })),
-        axios.get(`${API}/chains`).catch(() => ({ data: [] })),
-        axios.get(`${API}/protocols`).catch(() => ({ data: [] })),
-        axios.get(`${API}/zetachain/omnichain-pools`).catch(() => ({ data: [] })),
-        axios.get(`${API}/zetachain/supported-chains`).catch(() => ({ data: { chains: [] } }))
-      ]);
+      const response = await fetch(`${API}/dashboard`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ panels: Object.keys(setters) }),
+      });
+      if (!response.ok) throw new Error(`Dashboard request failed with status ${response.status}`);
 
-      setApiStatus(apiStatusRes.data);
-      setZetachainStatus(zetachainStatusRes.data);
-      setAnalytics(analyticsRes.data);
-      setPools(poolsRes.data);
-      setPortfolio(portfolioRes.data);
-      setArbitrage(arbitrageRes.data);
-      setChains(chainsRes.data);
-      setProtocols(protocolsRes.data);
-      setZetaPools(zetaPoolsRes.data);
-      setSupportedChains(supportedChainsRes.data.chains || []);
-      setLoading(false);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = '';
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split('\n');
+        buffered = lines.pop();
+        lines.filter(Boolean).forEach((line) => applyPanel(JSON.parse(line)));
+      }
     } catch (error) {
       console.error('Error fetching data:', error);
-      setLoading(false);
     }
+    pending.forEach((panel) => setters[panel](fallbacks[panel]));
+    setLoading(false);
   };
 
   const getChainIcon = (chainId) => {
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+# Fail fast instead of waiting on the live ZetaChain node at import time, and
+# keep the tests away from the warm-start file a local server may have written
+os.environ.setdefault("ZETACHAIN_RPC_URL", "http://127.0.0.1:9")
+os.environ["WARM_START_PATH"] = ""
+os.environ.pop("SHARED_SNAPSHOT_PATH", None)
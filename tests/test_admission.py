@@ -0,0 +1,27 @@
+from starlette.testclient import TestClient
+
+import server
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def test_per_client_limit_is_off_by_default():
+    client = TestClient(server.AdmissionMiddleware(endpoint))
+
+    assert {client.get("/api/pools").status_code for _ in range(100)} == {200}
+
+
+def test_clients_are_keyed_on_the_configured_header(monkeypatch):
+    monkeypatch.setattr(server, "ADMISSION_CLIENT_RATE", 1.0)
+    monkeypatch.setattr(server, "ADMISSION_CLIENT_BURST", 2.0)
+    monkeypatch.setattr(server, "ADMISSION_CLIENT_HEADER", b"x-forwarded-for")
+    client = TestClient(server.AdmissionMiddleware(endpoint))
+
+    def get(address):
+        return client.get("/api/pools", headers={"x-forwarded-for": f"{address}, 10.0.0.1"}).status_code
+
+    assert [get("203.0.113.1") for _ in range(3)] == [200, 200, 429]
+    assert get("203.0.113.2") == 200
@@ -0,0 +1,86 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import server
+
+
+def route_profit(x, buy_usd, buy_token, buy_fee, sell_token, sell_usd, sell_fee):
+    """Swap x USD for tokens on one pool and sell them on the other, step by step"""
+    tokens = buy_token * (1 - buy_fee) * x / (buy_usd + (1 - buy_fee) * x)
+    return sell_usd * (1 - sell_fee) * tokens / (sell_token + (1 - sell_fee) * tokens) - x
+
+
+@pytest.mark.parametrize("buy_usd, buy_token, buy_fee, sell_token, sell_usd, sell_fee", [
+    (2_500_000, 1000, 0.003, 1000, 2_600_000, 0.003),
+    (10_000_000, 4000, 0.003, 300, 800_000, 0.0005),
+    (500_000, 250, 0.01, 5000, 10_500_000, 0.003),
+])
+def test_optimal_size_matches_brute_force(buy_usd, buy_token, buy_fee, sell_token, sell_usd, sell_fee):
+    size, profit = server.optimal_arbitrage(buy_usd, buy_token, buy_fee, sell_token, sell_usd, sell_fee)
+    amounts = np.linspace(1, 4 * size, 200_001)
+    profits = route_profit(amounts, buy_usd, buy_token, buy_fee, sell_token, sell_usd, sell_fee)
+
+    assert size > 0
+    assert profit == pytest.approx(route_profit(size, buy_usd, buy_token, buy_fee, sell_token, sell_usd, sell_fee))
+    assert profit >= profits.max() - 1e-6
+    assert size == pytest.approx(amounts[profits.argmax()], rel=1e-3)
+
+
+@pytest.mark.parametrize("reserves", [
+    # Same price on both pools; the fees eat any trade
+    (2_500_000, 1000, 0.003, 1000, 2_500_000, 0.003),
+    # Price gap smaller than the two fees
+    (2_500_000, 1000, 0.003, 1000, 2_510_000, 0.003),
+    # Selling where the token is cheaper
+    (2_600_000, 1000, 0.003, 1000, 2_500_000, 0.003),
+])
+def test_no_profit_returns_zero(reserves):
+    assert server.optimal_arbitrage(*reserves) == (0.0, 0.0)
+
+
+@pytest.mark.parametrize("reserves", [
+    (0, 1000, 0.003, 1000, 2_600_000, 0.003),
+    (2_500_000, 0, 0.003, 1000, 2_600_000, 0.003),
+    (2_500_000, 1000, 0.003, 0, 2_600_000, 0.003),
+    (2_500_000, 1000, 0.003, 1000, 0, 0.003),
+])
+def test_empty_reserve_never_trades(reserves):
+    size, profit = server.optimal_arbitrage(*reserves)
+    assert size == 0
+    assert profit == 0
+
+
+def word(value):
+    return f"{value:064x}"
+
+
+def test_reserve_reader_decodes_batched_get_reserves(monkeypatch):
+    pairs = ["0xpair0", "0xpair1", "0xpair2", "0xpair3"]
+    results = [
+        "0x" + word(1_500_000 * 10 ** 6) + word(600 * 10 ** 18) + word(1_700_000_000),
+        "0x" + word(0) + word(600 * 10 ** 18) + word(1_700_000_000),
+        "0x",
+        None,
+    ]
+    calls = []
+
+    async def upstream_request(upstream, operation, url, method="GET", json_body=None):
+        calls.append(operation)
+        if operation == "eth_blockNumber":
+            return 200, [{"jsonrpc": "2.0", "id": 0, "result": hex(19_000_000)}]
+        assert {request["params"][1] for request in json_body} == {hex(19_000_000)}
+        assert {request["params"][0]["data"] for request in json_body} == {server.GET_RESERVES_SELECTOR}
+        # Batched responses may come back in any order
+        return 200, [{"jsonrpc": "2.0", "id": i, "result": results[i]} for i in reversed(range(len(results)))]
+
+    monkeypatch.setattr(server, "upstream_request", upstream_request)
+    reader = server.ReserveReader()
+
+    reserves = asyncio.run(reader.read("ethereum", "http://rpc", pairs))
+    assert reserves == {"0xpair0": (1_500_000 * 10 ** 6, 600 * 10 ** 18)}
+
+    # Same block: answered from the cache without another eth_call batch
+    assert asyncio.run(reader.read("ethereum", "http://rpc", pairs[:1])) == reserves
+    assert calls == ["eth_blockNumber", "eth_call:getReserves", "eth_blockNumber"]
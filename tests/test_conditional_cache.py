@@ -0,0 +1,27 @@
+import server
+
+
+def entry(size):
+    return {"etag": '"v1"', "last_modified": None, "data": {}, "size": size}
+
+
+def test_least_recently_used_urls_are_evicted():
+    cache = server.ConditionalCache(max_entries=3, max_bytes=1000)
+    for n in range(3):
+        cache.put(f"/chart/{n}", entry(10))
+    cache.get("/chart/0")
+    cache.put("/chart/3", entry(10))
+
+    assert list(cache.entries) == ["/chart/2", "/chart/0", "/chart/3"]
+    assert cache.size == 30
+
+
+def test_size_is_bounded_by_body_bytes():
+    cache = server.ConditionalCache(max_entries=100, max_bytes=100)
+    for n in range(5):
+        cache.put(f"/chart/{n}", entry(40))
+    cache.put("/too-big", entry(200))
+    cache.put("/chart/4", entry(10))
+
+    assert list(cache.entries) == ["/chart/3", "/chart/4"]
+    assert cache.size == 50
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+import server
+
+BATCH_PATH = "/api/zetachain/cross-chain-transactions"
+TRANSFERS = [
+    {"from_chain": "ethereum", "to_chain": "zetachain", "amount": 1.5, "token": "ETH", "reference": "a"},
+    {"from_chain": "bsc", "to_chain": "polygon", "amount": 250.0, "token": "USDC"},
+    {"from_chain": "arbitrum", "to_chain": "ethereum", "amount": 1000.0, "token": "USDC"},
+    {"from_chain": "zetachain", "to_chain": "avalanche", "amount": 0.25, "token": "ETH"},
+]
+QUOTE_FIELDS = ("from_chain", "to_chain", "amount", "token", "cross_chain_fee", "zeta_chain_fee",
+                "processing_time_seconds", "status")
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    writes = []
+
+    def schedule_write(coro):
+        writes.append(coro)
+        coro.close()
+
+    monkeypatch.setattr(server, "schedule_write", schedule_write)
+    return writes
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def test_batch_matches_single_quotes(client, writes):
+    response = client.post(BATCH_PATH, json={"transfers": TRANSFERS})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == len(TRANSFERS)
+    for transfer, quote in zip(TRANSFERS, body["transactions"]):
+        single = asyncio.run(server.simulate_cross_chain_transaction(
+            transfer["from_chain"], transfer["to_chain"], transfer["amount"], transfer["token"]))
+        assert {field: quote[field] for field in QUOTE_FIELDS} == {field: single[field] for field in QUOTE_FIELDS}
+    assert body["transactions"][0]["reference"] == "a"
+    assert body["max_processing_time_seconds"] == max(q["processing_time_seconds"] for q in body["transactions"])
+    assert len(writes) == 1
+
+
+def test_batch_hashes_are_distinct(client, writes):
+    body = client.post(BATCH_PATH, json={"transfers": TRANSFERS * 50}).json()
+
+    hashes = [quote["tx_hash"] for quote in body["transactions"]]
+    assert len(set(hashes)) == len(hashes)
+    assert all(len(tx_hash) == 66 and tx_hash.startswith("0x") for tx_hash in hashes)
+
+
+def test_batch_totals_per_token(client, writes):
+    totals = client.post(BATCH_PATH, json={"transfers": TRANSFERS, "dry_run": True}).json()["totals"]
+
+    assert totals["USDC"]["amount"] == pytest.approx(1250.0)
+    assert totals["USDC"]["cross_chain_fee"] == pytest.approx(1250.0 * server.CROSS_CHAIN_FEE_RATE)
+    assert totals["ETH"]["zeta_chain_fee"] == pytest.approx(
+        1.75 * server.CROSS_CHAIN_FEE_RATE * server.ZETACHAIN_FEE_SHARE)
+
+
+def test_dry_run_quotes_without_recording(client, writes):
+    body = client.post(BATCH_PATH, json={"transfers": TRANSFERS, "dry_run": True}).json()
+
+    assert {quote["status"] for quote in body["transactions"]} == {"quoted"}
+    assert writes == []
+
+
+@pytest.mark.parametrize("transfers", [[], [{**TRANSFERS[0], "to_chain": "solana"}]])
+def test_rejected_batches(client, writes, transfers):
+    assert client.post(BATCH_PATH, json={"transfers": transfers}).status_code == 400
+    assert writes == []
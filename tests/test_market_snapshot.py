@@ -0,0 +1,102 @@
+import operator
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def cache():
+    cache = server.MarketDataCache()
+    pools = server.synthetic_pools(200)
+    pools[0]["apy_volatility_30d"] = 1.25
+    cache.apply(pools, "defillama", {"ethereum": {"usd": 2500}}, server.generate_arbitrage_opportunities())
+    return cache
+
+
+def write_snapshot(tmp_path, cache, version=1):
+    meta = {"pools_source": cache.pools_source, "prices": cache.prices, "protocols": [],
+            "opportunities": list(cache.opportunities.values()), "stale": False}
+    path = tmp_path / "market_snapshot.bin"
+    path.write_bytes(server.encode_market_snapshot(version, *server.market_snapshot_parts(cache, meta)))
+    return path
+
+
+def test_snapshot_round_trip(tmp_path, cache):
+    snapshot = server.MappedSnapshot(write_snapshot(tmp_path, cache, version=7))
+
+    assert snapshot.version == 7
+    assert snapshot.pool_count == len(cache.pools)
+    for pool_id, row in cache.pools.items():
+        assert snapshot.row(snapshot.row_index(pool_id)) == row
+        assert snapshot.fragment(snapshot.row_index(pool_id)) == cache.pool_fragments[pool_id]
+
+
+def test_snapshot_loads_into_cache(tmp_path, cache):
+    follower = server.MarketDataCache()
+    follower.load_snapshot(server.MappedSnapshot(write_snapshot(tmp_path, cache)))
+
+    assert dict(follower.pools) == cache.pools
+    assert follower.pools_by_chain == cache.pools_by_chain
+    assert follower.rollups.summary([0.5], 20) == cache.rollups.summary([0.5], 20)
+    assert follower.opportunities.top_body(10) == cache.opportunities.top_body(10)
+
+
+def test_snapshot_rejects_overlong_section_names(monkeypatch, cache):
+    long_name = "x" * (server.SNAPSHOT_SECTION_NAME_BYTES + 1)
+    monkeypatch.setattr(server, "POOL_FLOAT_COLUMNS", server.POOL_FLOAT_COLUMNS + (long_name,))
+    for row in cache.pools.values():
+        row[long_name] = 0.0
+
+    with pytest.raises(ValueError, match="longer than"):
+        server.encode_market_snapshot(1, *server.market_snapshot_parts(cache, {}))
+
+
+@pytest.fixture
+def follower(tmp_path, cache):
+    follower = server.MarketDataCache()
+    follower.load_snapshot(server.MappedSnapshot(write_snapshot(tmp_path, cache)))
+    return follower
+
+
+def test_ids_are_found_without_an_id_dict(follower, cache):
+    snapshot = follower.pools.snapshot
+    assert not hasattr(snapshot, "row_by_id")
+    assert list(follower.pools) == list(cache.pools)
+    assert snapshot.row_index("missing") is None
+    assert "missing" not in follower.pools
+    with pytest.raises(KeyError):
+        follower.pool_fragments["missing"]
+
+
+def test_filters_run_on_the_mapped_columns(follower, cache):
+    chain_id = next(iter(cache.pools.values()))["chain_id"]
+    protocol_id = next(iter(cache.pools.values()))["protocol_id"]
+
+    def ids(rows):
+        return sorted(row["id"] for row in rows)
+
+    assert ids(follower.pool_list(chain_id)) == ids(cache.pool_list(chain_id))
+    assert ids(follower.pool_list(chain_id, protocol_id)) == ids(cache.pool_list(chain_id, protocol_id))
+    assert follower.pool_list("no-such-chain") == []
+    assert ids(follower.pool_list()) == ids(cache.pool_list())
+
+
+def test_scans_project_after_filtering(follower, cache):
+    predicates = [("apy", operator.ge, 5.0), ("risk_score", operator.le, 6.0), ("il_risk", operator.eq, "Low")]
+    columns = ["id", "apy", "rewards_tokens"]
+
+    expected = sorted(cache.scan_pools(None, None, predicates, columns), key=lambda row: row["id"])
+    scanned = sorted(follower.scan_pools(None, None, predicates, columns), key=lambda row: row["id"])
+    assert scanned == expected
+    assert expected and all(list(row) == columns for row in scanned)
+    # A missing value never passes a comparison
+    assert list(follower.scan_pools(None, None, [("apy_7d", operator.ge, -1e12)], ["id"])) == \
+        list(cache.scan_pools(None, None, [("apy_7d", lambda value, bound: value is not None and value >= bound,
+                                            -1e12)], ["id"]))
+
+
+def test_sampled_pools_are_whole_rows(follower, cache):
+    sample = follower.sample_pools(8)
+    assert len(sample) == 8
+    assert all(row == cache.pools[row["id"]] for row in sample)
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import server
+
+NOW = datetime(2026, 1, 1, 12, 0)
+
+
+def quote(token, source, dest, net_profit, expires_in=300, now=NOW):
+    return {
+        "id": server.opportunity_id(token, source, dest),
+        "token_symbol": token,
+        "source_chain": source,
+        "dest_chain": dest,
+        "source_price": 2500.0,
+        "dest_price": 2510.0,
+        "profit_percentage": 0.4,
+        "profit_usd": net_profit + 5,
+        "gas_cost_usd": 5.0,
+        "net_profit_usd": net_profit,
+        "trade_size_usd": 10000.0,
+        "expires_at": now + timedelta(seconds=expires_in),
+    }
+
+
+def test_ids_are_stable_per_route():
+    assert server.opportunity_id("ETH", "ethereum", "arbitrum") == server.opportunity_id("ETH", "ethereum", "arbitrum")
+    assert server.opportunity_id("ETH", "ethereum", "arbitrum") != server.opportunity_id("ETH", "arbitrum", "ethereum")
+
+
+def test_unchanged_requote_produces_no_delta():
+    book = server.OpportunityBook()
+    first = book.merge([quote("ETH", "ethereum", "arbitrum", 40), quote("ETH", "polygon", "ethereum", 20)], NOW)
+    assert len(first["upserted"]) == 2
+
+    later = NOW + timedelta(seconds=60)
+    again = book.merge([quote("ETH", "ethereum", "arbitrum", 40, now=later),
+                        quote("ETH", "polygon", "ethereum", 20, now=later)], later)
+    assert again == {"upserted": [], "removed": []}
+    # The re-quote still pushed the expiry back
+    assert book[server.opportunity_id("ETH", "ethereum", "arbitrum")]["expires_at"] == later + timedelta(seconds=300)
+    assert book.expire(NOW + timedelta(seconds=330)) == []
+
+
+def test_changed_quote_is_upserted_under_the_same_id():
+    book = server.OpportunityBook()
+    book.merge([quote("ETH", "ethereum", "arbitrum", 40)], NOW)
+
+    changes = book.merge([quote("ETH", "ethereum", "arbitrum", 55)], NOW)
+    assert changes["removed"] == []
+    assert [row["net_profit_usd"] for row in changes["upserted"]] == [55]
+    assert len(book) == 1
+
+
+def test_ranking_and_expiry():
+    book = server.OpportunityBook()
+    book.merge([quote("ETH", "ethereum", "arbitrum", 10, expires_in=60),
+                quote("ETH", "polygon", "ethereum", 30, expires_in=600),
+                quote("ETH", "arbitrum", "polygon", 20, expires_in=120)], NOW)
+    assert [row["net_profit_usd"] for row in book.top(3)] == [30, 20, 10]
+    assert server.loads_json(book.top_body(2)) == server.loads_json(server.dumps_json(book.top(2)))
+
+    expired = book.expire(NOW + timedelta(seconds=121))
+    assert sorted(expired) == sorted([server.opportunity_id("ETH", "ethereum", "arbitrum"),
+                                      server.opportunity_id("ETH", "arbitrum", "polygon")])
+    assert [row["net_profit_usd"] for row in book.top(3)] == [30]
+
+
+def test_stale_quotes_are_not_added():
+    book = server.OpportunityBook()
+    changes = book.merge([quote("ETH", "ethereum", "arbitrum", 10, expires_in=-1)], NOW)
+    assert changes == {"upserted": [], "removed": []}
+    assert len(book) == 0
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.documents.extend(documents)
+
+
+def test_history_stores_utc_dates(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(server, "db", type("FakeDb", (), {"arbitrage_history": collection})())
+    row = quote("ETH", "ethereum", "arbitrum", 40)
+
+    asyncio.run(server.write_opportunity_history([row], NOW))
+
+    [document] = collection.documents
+    assert document["quoted_at"].tzinfo == timezone.utc
+    assert document["expires_at"] == row["expires_at"].astimezone(timezone.utc)
+    assert document["id"] == row["id"]
+
+
+def frozen_now(monkeypatch, now):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    monkeypatch.setattr(server, "datetime", FrozenDatetime)
+
+
+def test_expired_by_a_read_still_reaches_subscribers(monkeypatch):
+    cache = server.MarketDataCache()
+    hub = server.MarketPushHub(cache)
+    monkeypatch.setattr(server, "market_cache", cache)
+    frozen_now(monkeypatch, NOW)
+    short, long = quote("ETH", "ethereum", "arbitrum", 40, expires_in=60), quote("ETH", "polygon", "ethereum", 20)
+    hub.publish(cache.apply([], "defillama", {}, [short, long]))
+    subscriber = hub.subscribe(since=hub.seq)
+
+    frozen_now(monkeypatch, NOW + timedelta(seconds=61))
+    response = asyncio.run(server.get_arbitrage_opportunities(limit=10))
+    assert [row["id"] for row in server.loads_json(response.body)] == [long["id"]]
+    assert short["id"] in cache.opportunities
+
+    hub.publish(cache.apply([], "defillama", {}, [long]))
+    frame = subscriber.queue.get_nowait()
+    delta = server.loads_json(frame.split(b"data: ", 1)[1])
+    assert delta["arbitrage"] == {"upserted": [], "removed": [short["id"]]}
+
+
+def test_fallback_quotes_are_stable_within_a_bucket():
+    bucket = server.ARBITRAGE_FALLBACK_BUCKET_SECONDS
+    start = datetime.fromtimestamp(1_800_000_000 // bucket * bucket)
+    first = server.generate_arbitrage_opportunities(start)
+    again = server.generate_arbitrage_opportunities(start + timedelta(seconds=bucket - 1))
+    assert first and first == again
+
+    book = server.OpportunityBook()
+    book.merge(first, start)
+    assert book.merge(again, start + timedelta(seconds=bucket - 1)) == {"upserted": [], "removed": []}
+
+    later = server.generate_arbitrage_opportunities(start + timedelta(seconds=bucket))
+    assert later != first
+    assert all(row["expires_at"] > start + timedelta(seconds=bucket) for row in first)
@@ -0,0 +1,86 @@
+import copy
+
+import server
+
+
+def snapshot(rows):
+    return {row["id"]: row for row in rows}
+
+
+def validated(count=50, seed=11):
+    return snapshot(server.Pool.model_validate(row).model_dump() for row in server.synthetic_pools(count, seed=seed))
+
+
+def churn(old):
+    new = copy.deepcopy(old)
+    ids = list(new)
+    del new[ids[0]], new[ids[1]]
+    new[ids[2]]["apy"] += 1.5
+    new[ids[3]].update(tvl_usd=new[ids[3]]["tvl_usd"] * 2, symbol="NEW-USDC")
+    new[ids[4]]["chain_id"] = "zetachain" if new[ids[4]]["chain_id"] != "zetachain" else "ethereum"
+    added = next(iter(validated(1, seed=12).values()))
+    new[added["id"]] = added
+    return new
+
+
+def test_diff_reports_added_changed_and_removed():
+    old = validated()
+    new = churn(old)
+    ids = list(old)
+
+    diff = server.diff_pool_snapshots(old, new)
+
+    assert diff["removed"] == ids[:2]
+    assert [row["id"] for row in diff["added"]] == [id_ for id_ in new if id_ not in old]
+    assert diff["changed"] == {
+        ids[2]: {"apy": new[ids[2]]["apy"]},
+        ids[3]: {"tvl_usd": new[ids[3]]["tvl_usd"], "symbol": "NEW-USDC"},
+        ids[4]: {"chain_id": new[ids[4]]["chain_id"]},
+    }
+
+
+def test_unchanged_snapshots_produce_an_empty_diff():
+    old = validated()
+    assert server.diff_pool_snapshots(old, copy.deepcopy(old)) == {"added": [], "removed": [], "changed": {}}
+
+
+def test_dropped_fields_are_reported_as_none():
+    diff = server.diff_pool_snapshots({"a": {"id": "a", "apy": 1.0, "apy_7d": 2.0}}, {"a": {"id": "a", "apy": 1.0}})
+    assert diff["changed"] == {"a": {"apy_7d": None}}
+
+
+def apply_delta(pools, diff):
+    """What a push subscriber does with a delta"""
+    pools = {pool_id: dict(row) for pool_id, row in pools.items() if pool_id not in diff["removed"]}
+    for row in diff["added"]:
+        pools[row["id"]] = row
+    for pool_id, fields in diff["changed"].items():
+        pools[pool_id].update(fields)
+    return pools
+
+
+def test_delta_applied_to_the_old_snapshot_gives_the_new_one():
+    old = validated()
+    new = churn(old)
+
+    assert apply_delta(old, server.diff_pool_snapshots(old, new)) == new
+
+
+def test_merge_pools_matches_a_cache_built_from_scratch():
+    old = validated()
+    new = churn(old)
+    cache = server.MarketDataCache()
+    cache.apply(list(old.values()), "defillama", {}, [])
+    version = cache.version
+
+    cache.merge_pools(server.diff_pool_snapshots(cache.pools, new))
+    fresh = server.MarketDataCache()
+    fresh.apply(list(new.values()), "defillama", {}, [])
+
+    assert cache.version == version + 1
+    assert cache.pools == new
+    assert cache.pool_fragments == fresh.pool_fragments
+    assert {key: ids for key, ids in cache.pools_by_chain.items() if ids} == fresh.pools_by_chain
+    assert {key: ids for key, ids in cache.pools_by_protocol.items() if ids} == fresh.pools_by_protocol
+    assert cache.rollups.summary([0.5], 50) == fresh.rollups.summary([0.5], 50)
+    assert cache.search_index.postings == fresh.search_index.postings
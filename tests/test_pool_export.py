@@ -0,0 +1,50 @@
+import pytest
+from starlette.testclient import TestClient
+
+import server
+
+QUERY = {"format": "ndjson", "columns": "id,chain_id,apy,il_risk", "min_apy": 5, "max_risk_score": 7,
+         "il_risk": "Low"}
+
+
+@pytest.fixture
+def cache():
+    cache = server.MarketDataCache()
+    cache.apply(server.synthetic_pools(500), "defillama", {}, [])
+    return cache
+
+
+@pytest.fixture
+def follower(tmp_path, cache):
+    meta = {"pools_source": cache.pools_source, "prices": {}, "protocols": [], "opportunities": [], "stale": False}
+    path = tmp_path / "market_snapshot.bin"
+    path.write_bytes(server.encode_market_snapshot(1, *server.market_snapshot_parts(cache, meta)))
+    follower = server.MarketDataCache()
+    follower.load_snapshot(server.MappedSnapshot(path))
+    return follower
+
+
+def export(monkeypatch, cache, **params):
+    monkeypatch.setattr(server, "market_cache", cache)
+    response = TestClient(server.app).get("/api/export/pools", params={**QUERY, **params})
+    assert response.status_code == 200
+    return [server.loads_json(line) for line in response.content.splitlines()]
+
+
+def test_export_filters_and_projects(monkeypatch, cache):
+    rows = export(monkeypatch, cache)
+
+    expected = [pool for pool in cache.pools.values()
+                if pool["apy"] >= 5 and pool["risk_score"] <= 7 and pool["il_risk"] == "Low"]
+    assert [row["id"] for row in rows] == [pool["id"] for pool in expected]
+    assert all(list(row) == ["id", "chain_id", "apy", "il_risk"] for row in rows)
+
+
+def test_snapshot_export_matches_in_process_export(monkeypatch, cache, follower):
+    chain_id = next(iter(cache.pools.values()))["chain_id"]
+
+    assert export(monkeypatch, follower) == export(monkeypatch, cache)
+    # Index lookups return a chain's pools in no particular order
+    assert sorted(export(monkeypatch, follower, chain_id=chain_id), key=lambda row: row["id"]) == \
+        sorted(export(monkeypatch, cache, chain_id=chain_id), key=lambda row: row["id"])
+    assert export(monkeypatch, follower, il_risk="Unknown") == []
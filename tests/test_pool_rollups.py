@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+import server
+
+QUANTILES = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+
+def sketch_of(values, accuracy=server.ROLLUP_SKETCH_ACCURACY):
+    sketch = server.QuantileSketch(accuracy)
+    for value in values:
+        sketch.add(float(value))
+    return sketch
+
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.05])
+@pytest.mark.parametrize("values", [
+    np.random.default_rng(1).lognormal(2, 1.5, 5000),
+    np.random.default_rng(2).normal(0, 50, 5000),
+    np.concatenate([np.zeros(100), np.random.default_rng(3).uniform(0.001, 1000, 900)]),
+])
+def test_quantiles_within_relative_accuracy(values, accuracy):
+    sketch = sketch_of(values, accuracy)
+
+    for q in QUANTILES:
+        exact = np.quantile(values, q, method="lower")
+        assert abs(sketch.quantile(q) - exact) <= accuracy * abs(exact) + 1e-12, q
+
+
+def test_merged_sketches_equal_one_sketch_of_all_values():
+    rng = np.random.default_rng(4)
+    parts = [rng.lognormal(1, 1, 700), rng.normal(-5, 10, 300), np.zeros(20)]
+    merged = server.QuantileSketch()
+    for part in parts:
+        merged.merge(sketch_of(part))
+    combined = sketch_of(np.concatenate(parts))
+
+    assert merged.positive == combined.positive
+    assert merged.negative == combined.negative
+    assert (merged.zero, merged.count) == (combined.zero, combined.count)
+    assert [merged.quantile(q) for q in QUANTILES] == [combined.quantile(q) for q in QUANTILES]
+
+
+def test_removed_values_leave_no_trace():
+    sketch = sketch_of([1.0, 2.0, 3.0])
+    sketch.add(50.0)
+    sketch.remove(50.0)
+
+    assert sketch.positive == sketch_of([1.0, 2.0, 3.0]).positive
+    assert server.QuantileSketch().quantile(0.5) is None
+
+
+def rollups_of(rows):
+    rollups = server.PoolRollups()
+    for row in rows:
+        rollups.add(row)
+    return rollups
+
+
+def test_incremental_rollups_match_a_rebuild():
+    old = server.synthetic_pools(400, seed=1)
+    new = server.synthetic_pools(400, seed=2)[:300]
+    for row in new[:50]:
+        row["tvl_usd"] *= 2
+    rollups = rollups_of(old)
+    for row in old:
+        rollups.remove(row)
+    for row in new:
+        rollups.add(row)
+    rebuilt = rollups_of(new)
+
+    assert rollups.summary(QUANTILES, 50) == rebuilt.summary(QUANTILES, 50)
+    assert set(rollups.chains) == {row["chain_id"] for row in new}
+    assert set(rollups.protocols) == {row["protocol_id"] for row in new}
+
+
+def test_group_totals_and_histograms():
+    rows = server.synthetic_pools(500, seed=5)
+    summary = rollups_of(rows).summary([0.5], 100)
+
+    assert summary["pools"] == len(rows)
+    assert summary["tvl_usd"] == pytest.approx(sum(row["tvl_usd"] for row in rows))
+    for group in summary["by_chain"]:
+        members = [row for row in rows if row["chain_id"] == group["chain_id"]]
+        assert group["pools"] == len(members)
+        assert group["tvl_usd"] == pytest.approx(sum(row["tvl_usd"] for row in members), abs=0.01 * len(members))
+    apy = np.array([row["apy"] for row in rows])
+    edges = server.APY_HISTOGRAM_EDGES
+    expected = np.bincount(np.searchsorted(edges, apy, side="left"), minlength=len(edges) + 1)
+    assert [bucket["count"] for bucket in summary["apy_histogram"]] == expected.tolist()
@@ -0,0 +1,71 @@
+import pytest
+
+import server
+
+SYMBOLS = {
+    "weth-usdc": ("WETH-USDC", 9_000_000),
+    "eth-usdt": ("ETH/USDT", 4_000_000),
+    "ethx-frax": ("ETHX-FRAX", 1_000_000),
+    "dai-usdc-usdt": ("DAI-USDC-USDT", 7_000_000),
+    "wbtc-eth": ("WBTC-ETH", 3_000_000),
+    "op": ("OP", 500_000),
+}
+
+
+def pools(symbols):
+    rows = server.synthetic_pools(len(symbols), seed=7)
+    for row, (pool_id, (symbol, tvl)) in zip(rows, symbols.items()):
+        row.update(id=pool_id, symbol=symbol, name=symbol, tvl_usd=tvl)
+    return rows
+
+
+@pytest.fixture
+def cache():
+    cache = server.MarketDataCache()
+    cache.apply(pools(SYMBOLS), "defillama", {}, [])
+    return cache
+
+
+def test_exact_matches_rank_before_prefix_matches(cache):
+    # ETH exactly (directly or as the WETH alias) first, largest pool first; ETHX only by prefix
+    assert cache.search_index.search("eth") == ["weth-usdc", "eth-usdt", "wbtc-eth", "ethx-frax"]
+    assert cache.search_index.search("eth", mode="exact") == ["weth-usdc", "eth-usdt", "wbtc-eth"]
+
+
+def test_prefix_matches(cache):
+    assert cache.search_index.search("usd", mode="prefix") == ["weth-usdc", "dai-usdc-usdt", "eth-usdt"]
+    assert cache.search_index.search("wbt") == ["wbtc-eth"]
+
+
+def test_every_word_must_match(cache):
+    assert cache.search_index.search("usdc usdt") == ["dai-usdc-usdt"]
+    assert cache.search_index.search("wbtc usdc") == []
+
+
+def test_typos_match_fuzzily(cache):
+    assert cache.search_index.search("usdd") == ["weth-usdc", "dai-usdc-usdt", "eth-usdt"]
+    assert cache.search_index.search("wbct") == []
+    assert cache.search_index.search("wbtx", mode="fuzzy") == ["wbtc-eth"]
+    # Fuzzy only fills in when nothing matches exactly or by prefix
+    assert cache.search_index.search("dai") == ["dai-usdc-usdt"]
+
+
+def test_short_queries(cache):
+    assert cache.search_index.search("op") == ["op"]
+    assert cache.search_index.search("et", mode="prefix") == ["weth-usdc", "eth-usdt", "wbtc-eth", "ethx-frax"]
+    # Too short for trigrams, so no fuzzy fallback
+    assert cache.search_index.search("ox") == []
+    assert cache.search_index.search("") == []
+
+
+def test_refresh_updates_the_index(cache):
+    symbols = {pool_id: value for pool_id, value in SYMBOLS.items() if pool_id != "wbtc-eth"}
+    symbols["op"] = ("OP-USDC", 20_000_000)
+    cache.apply(pools(symbols), "defillama", {}, [])
+    index = cache.search_index
+
+    assert index.search("wbtc") == []
+    assert "WBTC" not in index.postings and "WBTC" not in index.sorted_terms
+    assert not any("WBTC" in terms for terms in index.trigrams.values())
+    assert index.search("usdc") == ["op", "weth-usdc", "dai-usdc-usdt"]
+    assert index.search("op") == ["op"]
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def market_cache(monkeypatch):
+    cache = server.MarketDataCache()
+    cache.apply(server.synthetic_pools(300), "defillama", {}, [])
+    monkeypatch.setattr(server, "market_cache", cache)
+    monkeypatch.setattr(server, "pools_query_cache", server.QueryResultCache("pools_test", 1 << 20))
+    return cache
+
+
+def pool_ids(**params):
+    response = asyncio.run(server.get_pools(include_zeta=False, **params))
+    return [row["id"] for row in server.loads_json(response.body)]
+
+
+def test_empty_filters_are_ignored(market_cache):
+    everything = pool_ids()
+    # The endpoint serves the top 20 by APY
+    top = sorted(market_cache.pools.values(), key=lambda row: row["apy"], reverse=True)[:20]
+    assert everything == [row["id"] for row in top]
+    assert pool_ids(chain_id="") == everything
+    assert pool_ids(protocol_id="") == everything
+    assert pool_ids(chain_id="", protocol_id="") == everything
+
+
+def test_filters_and_sorting(market_cache):
+    rows = [market_cache.pools[pool_id] for pool_id in pool_ids(chain_id="ethereum", sort_by="tvl")]
+    assert rows and all(row["chain_id"] == "ethereum" for row in rows)
+    assert [row["tvl_usd"] for row in rows] == sorted((row["tvl_usd"] for row in rows), reverse=True)
+    assert pool_ids(chain_id="no-such-chain") == []
@@ -0,0 +1,103 @@
+import pytest
+from starlette.testclient import TestClient
+
+import server
+
+PATH = "/api/zetachain/supported-chains"
+
+
+@pytest.fixture
+def cache():
+    return server.ResponseCache({PATH: "public, max-age=60"}, max_entries=4)
+
+
+@pytest.fixture
+def client(cache):
+    calls = []
+
+    async def endpoint(scope, receive, send):
+        calls.append(scope["query_string"])
+        body = b'{"chains":[' + b",".join(b'"chain"' for _ in range(200)) + b"]}"
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    client = TestClient(server.ResponseCacheMiddleware(endpoint, cache))
+    client.calls = calls
+    return client
+
+
+def test_unknown_query_parameters_share_one_entry(cache, client):
+    for n in range(50):
+        assert client.get(PATH, params={"x": n}).status_code == 200
+
+    assert list(cache.entries) == [PATH]
+    assert len(client.calls) == 1
+
+
+def test_entries_are_bounded(cache):
+    for n in range(10):
+        cache.store(f"/route-{n}", b"{}", b"application/json")
+    assert list(cache.entries) == [f"/route-{n}" for n in range(6, 10)]
+
+
+def test_each_encoding_has_its_own_etag(client):
+    identity = client.get(PATH, headers={"accept-encoding": "identity"})
+    gzipped = client.get(PATH, headers={"accept-encoding": "gzip"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+    assert identity.headers["vary"] == gzipped.headers["vary"] == "Accept-Encoding"
+    assert identity.json() == gzipped.json()
+
+
+def test_conditional_requests_match_only_their_encoding(client):
+    identity_etag = client.get(PATH, headers={"accept-encoding": "identity"}).headers["etag"]
+    gzip_etag = client.get(PATH, headers={"accept-encoding": "gzip"}).headers["etag"]
+
+    assert client.get(PATH, headers={"accept-encoding": "identity",
+                                     "if-none-match": identity_etag}).status_code == 304
+    assert client.get(PATH, headers={"accept-encoding": "gzip", "if-none-match": gzip_etag}).status_code == 304
+    # A validator for the other encoding must not be answered with a 304
+    assert client.get(PATH, headers={"accept-encoding": "gzip", "if-none-match": identity_etag}).status_code == 200
+    assert client.get(PATH, headers={"accept-encoding": "identity", "if-none-match": gzip_etag}).status_code == 200
+
+
+def test_invalidate_drops_every_variant(cache, client):
+    client.get(PATH)
+    cache.invalidate(PATH)
+    client.get(PATH)
+    assert len(client.calls) == 2
+
+
+def test_key_keeps_only_declared_parameters(cache):
+    assert cache.key("/api/pools", b"x=1&sort_by=tvl&chain_id=ethereum") == "/api/pools?chain_id=ethereum&sort_by=tvl"
+    assert cache.key("/api/pools", b"x=1") == "/api/pools"
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (b"gzip", True),
+    (b"gzip, deflate, br", True),
+    (b"br;q=1.0, gzip;q=0.5", True),
+    (b"GZIP", True),
+    (b"x-gzip", True),
+    (b"*", True),
+    (b"gzip;q=0", False),
+    (b"gzip;q=0.000, *", False),
+    (b"*;q=0", False),
+    (b"br, *;q=0", False),
+    (b"identity", False),
+    (b"xgzip-custom, gzipped", False),
+    (b"gzip;q=oops", False),
+    (b"", False),
+])
+def test_accept_encoding_q_values(accept_encoding, expected):
+    assert server._accepts_gzip(accept_encoding) is expected
+
+
+def test_refused_gzip_is_served_as_identity(client):
+    response = client.get(PATH, headers={"accept-encoding": "gzip;q=0, identity"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json()["chains"]
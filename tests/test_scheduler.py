@@ -0,0 +1,110 @@
+import asyncio
+
+import server
+
+
+async def run_for(scheduler, seconds):
+    task = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(seconds)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_job_is_cancelled_at_its_deadline():
+    events = []
+
+    async def slow():
+        events.append("start")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    scheduler = server.Scheduler(max_concurrency=1, jitter=0, stagger=0)
+    scheduler.add("slow", slow, interval=0.01, deadline=0.05)
+    asyncio.run(run_for(scheduler, 0.3))
+
+    job = scheduler.jobs["slow"]
+    assert job.failures == job.consecutive_failures >= 2
+    assert job.last_error == "deadline of 0.05s exceeded"
+    # Each run was cancelled before the next started, so runs never overlapped
+    assert events[:4] == ["start", "cancelled", "start", "cancelled"]
+    assert not job.running and not scheduler.running
+
+
+def test_a_deadline_miss_frees_the_slot_for_other_jobs():
+    fast_runs = []
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def fast():
+        fast_runs.append(1)
+
+    scheduler = server.Scheduler(max_concurrency=1, jitter=0, stagger=0)
+    scheduler.add("slow", slow, interval=60, priority=0, deadline=0.05)
+    scheduler.add("fast", fast, interval=60, priority=1)
+    asyncio.run(run_for(scheduler, 0.2))
+
+    assert scheduler.jobs["slow"].failures == 1
+    assert fast_runs == [1]
+
+
+def test_stopping_the_scheduler_waits_for_cancelled_jobs():
+    finished = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            finished.append("job")
+
+    scheduler = server.Scheduler(max_concurrency=1, jitter=0, stagger=0)
+    scheduler.add("slow", slow, interval=60)
+    asyncio.run(run_for(scheduler, 0.05))
+
+    assert finished == ["job"]
+
+
+class Recorder:
+    def __init__(self, events, name):
+        self.events = events
+        self.name = name
+
+    async def save(self, cache):
+        self.events.append(f"{self.name}.save")
+
+    def release(self):
+        self.events.append(f"{self.name}.release")
+
+    def close(self):
+        self.events.append(f"{self.name}.close")
+
+
+def test_shutdown_stops_jobs_before_persisting(monkeypatch):
+    events = []
+    cache = server.MarketDataCache()
+    cache.pools_source = "defillama"
+    monkeypatch.setattr(server, "market_cache", cache)
+    monkeypatch.setattr(server, "warm_start", Recorder(events, "warm_start"))
+    monkeypatch.setattr(server, "shared_snapshot", Recorder(events, "shared_snapshot"))
+    monkeypatch.setattr(server, "client", Recorder(events, "mongo"))
+    monkeypatch.setattr(server, "http_session", None)
+
+    async def refresh():
+        try:
+            await asyncio.sleep(10)
+        finally:
+            events.append("refresh.stopped")
+
+    async def main():
+        scheduler = server.Scheduler(max_concurrency=1, jitter=0, stagger=0)
+        scheduler.add("market_refresh", refresh, interval=60)
+        monkeypatch.setattr(server, "background_tasks", [asyncio.create_task(scheduler.run())])
+        await asyncio.sleep(0.05)
+        await server.shutdown()
+
+    asyncio.run(main())
+
+    assert events == ["refresh.stopped", "warm_start.save", "shared_snapshot.release", "mongo.close"]
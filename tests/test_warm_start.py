@@ -0,0 +1,31 @@
+import asyncio
+
+import server
+
+
+def test_warm_start_round_trip(tmp_path):
+    cache = server.MarketDataCache()
+    cache.apply(server.synthetic_pools(100), "defillama", {"ethereum": {"usd": 2500}},
+                server.generate_arbitrage_opportunities())
+    warm_start = server.WarmStartFile(str(tmp_path / "warm_start.bin"))
+
+    asyncio.run(warm_start.save(cache))
+    data = warm_start.load()
+
+    assert data["pools_source"] == "defillama"
+    assert data["prices"] == cache.prices
+    assert {pool["id"]: pool for pool in data["pools"]} == cache.pools
+    assert len(data["opportunities"]) == len(cache.opportunities)
+
+
+def test_warm_start_ignores_corrupt_file(tmp_path):
+    path = tmp_path / "warm_start.bin"
+    cache = server.MarketDataCache()
+    cache.apply(server.synthetic_pools(10), "defillama", {}, [])
+    warm_start = server.WarmStartFile(str(path))
+    asyncio.run(warm_start.save(cache))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    assert warm_start.load() is None